@@ -1 +1,3 @@
 from .test_csv_loader import *
+from .test_option_master import *
+from .test_option_pricing import *
@@ -0,0 +1,164 @@
+"""
+Test if option master portfolio works fine with all pricing models
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from vnpy.app.option_master.base import PortfolioData
+from vnpy.app.option_master.engine import PRICING_MODELS
+from vnpy.app.option_master.pricing import black_scholes
+from vnpy.trader.constant import Direction, Exchange, Offset, OptionType, Product
+from vnpy.trader.object import ContractData, TickData, TradeData
+
+
+class TestOptionMaster(unittest.TestCase):
+
+    def setUp(self) -> None:
+        expiry = datetime.now() + timedelta(days=60)
+
+        self.contracts = []
+        for i in range(5):
+            strike = 2.8 + 0.1 * i
+
+            for option_type in [OptionType.CALL, OptionType.PUT]:
+                symbol = f"{option_type.name[0]}{i}"
+                contract = ContractData(
+                    symbol=symbol,
+                    exchange=Exchange.SSE,
+                    name=symbol,
+                    product=Product.OPTION,
+                    size=10000,
+                    pricetick=0.0001,
+                    option_strike=strike,
+                    option_underlying="510050_O",
+                    option_type=option_type,
+                    option_expiry=expiry,
+                    option_portfolio="510050_O",
+                    option_index=f"{strike:.3f}",
+                    gateway_name="TEST"
+                )
+                self.contracts.append(contract)
+
+        self.underlying = ContractData(
+            symbol="510050",
+            exchange=Exchange.SSE,
+            name="510050",
+            product=Product.EQUITY,
+            size=10000,
+            pricetick=0.001,
+            gateway_name="TEST"
+        )
+
+    def create_portfolio(self, pricing_model) -> PortfolioData:
+        """"""
+        portfolio = PortfolioData("510050_O.SSE")
+        portfolio.add_options(self.contracts)
+        portfolio.set_chain_underlying("510050_O.SSE", self.underlying)
+        portfolio.set_interest_rate(0.03)
+        portfolio.set_pricing_model(pricing_model)
+        return portfolio
+
+    def update_tick(
+        self,
+        portfolio: PortfolioData,
+        symbol: str,
+        bid_price: float,
+        ask_price: float
+    ) -> None:
+        """"""
+        tick = TickData(
+            symbol=symbol,
+            exchange=Exchange.SSE,
+            datetime=datetime.now(),
+            bid_price_1=bid_price,
+            ask_price_1=ask_price,
+            gateway_name="TEST"
+        )
+        portfolio.update_tick(tick)
+
+    def test_pricing_models(self):
+        for model_name, pricing_model in PRICING_MODELS.items():
+            with self.subTest(model_name):
+                portfolio = self.create_portfolio(pricing_model)
+                chain = portfolio.get_chain("510050_O.SSE")
+
+                # Option tick after underlying tick goes through scalar path
+                self.update_tick(portfolio, "510050", 2.999, 3.001)
+                self.update_tick(portfolio, "C2", 0.1450, 0.1460)
+                self.update_tick(portfolio, "P2", 0.1300, 0.1310)
+
+                option = chain.options["C2.SSE"]
+                self.assertGreater(option.bid_impv, 0)
+                self.assertGreater(option.ask_impv, option.bid_impv)
+
+                # Underlying tick recalculates the whole chain
+                self.update_tick(portfolio, "510050", 3.009, 3.011)
+                self.assertGreater(option.pricing_impv, 0)
+                self.assertGreater(option.theo_delta, 0)
+
+                trade = TradeData(
+                    symbol="C2",
+                    exchange=Exchange.SSE,
+                    orderid="1",
+                    tradeid="1",
+                    direction=Direction.LONG,
+                    offset=Offset.OPEN,
+                    price=0.1455,
+                    volume=2,
+                    gateway_name="TEST"
+                )
+                portfolio.update_trade(trade)
+
+                self.assertEqual(portfolio.net_pos, 2)
+                self.assertAlmostEqual(portfolio.pos_delta, option.theo_delta * 2)
+                self.assertAlmostEqual(chain.pos_vega, option.theo_vega * 2)
+
+    def test_add_option(self):
+        bulk_portfolio = self.create_portfolio(black_scholes)
+        bulk_chain = bulk_portfolio.get_chain("510050_O.SSE")
+
+        # Contracts are pushed one by one by gateway
+        portfolio = PortfolioData("510050_O.SSE")
+        for contract in self.contracts:
+            portfolio.add_option(contract)
+        portfolio.set_chain_underlying("510050_O.SSE", self.underlying)
+        portfolio.set_interest_rate(0.03)
+        portfolio.set_pricing_model(black_scholes)
+        chain = portfolio.get_chain("510050_O.SSE")
+
+        self.assertEqual(list(chain.options), list(bulk_chain.options))
+        self.assertEqual(chain.indexes, bulk_chain.indexes)
+        self.assertEqual(chain._strike_price.tolist(), bulk_chain._strike_price.tolist())
+        self.assertEqual(chain._option_type.tolist(), bulk_chain._option_type.tolist())
+
+        for p in [portfolio, bulk_portfolio]:
+            self.update_tick(p, "C2", 0.1450, 0.1460)
+            self.update_tick(p, "510050", 2.999, 3.001)
+        self.assertEqual(chain._theo_delta.tolist(), bulk_chain._theo_delta.tolist())
+
+    def test_flat_underlying_ticks(self):
+        portfolio = self.create_portfolio(black_scholes)
+        chain = portfolio.get_chain("510050_O.SSE")
+        option = chain.options["C2.SSE"]
+
+        # Option quotes arrive after the chain is calculated
+        self.update_tick(portfolio, "510050", 2.999, 3.001)
+        self.update_tick(portfolio, "C2", 0.1450, 0.1460)
+        self.assertEqual(option.theo_delta, 0)
+
+        # Underlying tick without price change still recalculates new quotes
+        for i in range(100):
+            self.update_tick(portfolio, "510050", 2.999, 3.001)
+        self.assertGreater(option.pricing_impv, 0)
+        self.assertGreater(option.theo_delta, 0)
+        self.assertGreater(option.theo_vega, 0)
+
+        # Chain is recalculated again with new interest rate
+        theo_price = option.theo_price
+        portfolio.set_interest_rate(0.05)
+        self.update_tick(portfolio, "510050", 2.999, 3.001)
+        self.assertNotEqual(option.theo_price, theo_price)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Test if array pricing functions match scalar ones with all implementations
+"""
+import unittest
+from itertools import product
+from unittest.mock import patch
+
+import numpy as np
+
+from vnpy.app.option_master.pricing import _greeks_kernels as kernels
+from vnpy.app.option_master.pricing import black_76, black_scholes
+
+
+class TestOptionPricing(unittest.TestCase):
+
+    def setUp(self) -> None:
+        strikes = np.linspace(2.5, 3.5, 11)
+        volatilities = [0.1, 0.25, 0.5]
+
+        self.s = 3.0
+        self.r = 0.03
+        self.t = 0.2
+
+        k, cp, v = zip(*product(strikes, [1, -1], volatilities))
+        self.k = np.array(k)
+        self.cp = np.array(cp, dtype=np.float64)
+        self.v = np.array(v)
+
+        # Numexpr branch can only be tested if installed
+        self.flags = [
+            (numba, numexpr)
+            for numba, numexpr in product([True, False], repeat=2)
+            if kernels.NUMBA_AVAILABLE or not numba
+            if kernels.NUMEXPR_AVAILABLE or not numexpr
+        ]
+
+    def check_model(self, model) -> None:
+        """"""
+        expected_greeks = np.array([
+            model.calculate_greeks(self.s, k, self.r, self.t, v, cp)
+            for k, cp, v in zip(self.k, self.cp, self.v)
+        ]).T
+
+        # Option prices with zero volatility are not solvable
+        prices = expected_greeks[0] + 0.0001
+        expected_impv = np.array([
+            model.calculate_impv(price, self.s, k, self.r, self.t, cp, min_time_value=0.0001)
+            for price, k, cp in zip(prices, self.k, self.cp)
+        ])
+        self.assertTrue((expected_impv > 0).all())
+
+        for numba, numexpr in self.flags:
+            with self.subTest(numba=numba, numexpr=numexpr), \
+                    patch.object(kernels, "NUMBA_AVAILABLE", numba), \
+                    patch.object(kernels, "NUMEXPR_AVAILABLE", numexpr):
+                greeks = model.calculate_greeks_array(
+                    self.s, self.k, self.r, self.t, self.v, self.cp
+                )
+                for result, expected in zip(greeks, expected_greeks):
+                    np.testing.assert_allclose(result, expected, rtol=1e-9, atol=1e-12)
+
+                impv = model.calculate_impv_array(
+                    prices, self.s, self.k, self.r, self.t, self.cp, min_time_value=0.0001
+                )
+                np.testing.assert_allclose(impv, expected_impv, rtol=0, atol=1e-12)
+
+    def test_black_scholes(self):
+        self.check_model(black_scholes)
+
+    def test_black_76(self):
+        self.check_model(black_76)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,23 @@
+import os
+import bisect
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from threading import Lock
 from datetime import datetime
-from typing import Dict, List, Callable
+from math import sqrt, exp
+from typing import Any, Dict, List, Set, Callable
 from types import ModuleType
 
+import numpy as np
+from numpy import ndarray
+
 from vnpy.trader.object import ContractData, TickData, TradeData
 from vnpy.trader.constant import Exchange, OptionType, Direction, Offset
 from vnpy.trader.converter import PositionHolding
 
 from .time import calculate_days_to_expiry, ANNUAL_DAYS
+from .pricing._cuda_kernels import CUPY_AVAILABLE, to_device
 
 
 APP_NAME = "OptionMaster"
@@ -25,6 +36,11 @@ CHAIN_UNDERLYING_MAP = {
 class InstrumentData:
     """"""
 
+    __slots__ = (
+        "symbol", "exchange", "vt_symbol", "pricetick", "min_volume", "size",
+        "long_pos", "short_pos", "net_pos", "mid_price", "tick", "portfolio"
+    )
+
     def __init__(self, contract: ContractData):
         """"""
         self.symbol: str = contract.symbol
@@ -80,6 +96,14 @@ class InstrumentData:
 class OptionData(InstrumentData):
     """"""
 
+    # Expiry time and pos greeks are properties, not listed in slots
+    __slots__ = (
+        "strike_price", "chain_index", "option_type", "option_expiry",
+        "interest_rate", "underlying", "chain", "row_index",
+        "underlying_adjustment", "bid_impv", "ask_impv", "mid_impv",
+        "pricing_impv", "theo_price", "theo_delta", "theo_gamma", "theo_theta", "theo_vega"
+    )
+
     def __init__(self, contract: ContractData):
         """"""
         super().__init__(contract)
@@ -95,23 +119,15 @@ class OptionData(InstrumentData):
             self.option_type = -1
 
         self.option_expiry: datetime = contract.option_expiry
-        self.days_to_expiry: int = calculate_days_to_expiry(
-            contract.option_expiry
-        )
-        self.time_to_expiry: float = self.days_to_expiry / ANNUAL_DAYS
 
         self.interest_rate: float = 0
 
         # Option portfolio related
         self.underlying: UnderlyingData = None
         self.chain: ChainData = None
+        self.row_index: int = 0
         self.underlying_adjustment: float = 0
 
-        # Pricing model
-        self.calculate_price: Callable = None
-        self.calculate_greeks: Callable = None
-        self.calculate_impv: Callable = None
-
         # Implied volatility
         self.bid_impv: float = 0
         self.ask_impv: float = 0
@@ -126,11 +142,40 @@ class OptionData(InstrumentData):
         self.theo_theta: float = 0
         self.theo_vega: float = 0
 
-        self.pos_value: float = 0
-        self.pos_delta: float = 0
-        self.pos_gamma: float = 0
-        self.pos_theta: float = 0
-        self.pos_vega: float = 0
+    @property
+    def days_to_expiry(self) -> int:
+        """Shared by all options in the same chain"""
+        return self.chain.days_to_expiry
+
+    @property
+    def time_to_expiry(self) -> float:
+        """Shared by all options in the same chain"""
+        return self.chain.time_to_expiry
+
+    @property
+    def pos_value(self) -> float:
+        """"""
+        return self.theo_price * self.size * self.net_pos
+
+    @property
+    def pos_delta(self) -> float:
+        """"""
+        return self.theo_delta * self.net_pos
+
+    @property
+    def pos_gamma(self) -> float:
+        """"""
+        return self.theo_gamma * self.net_pos
+
+    @property
+    def pos_theta(self) -> float:
+        """"""
+        return self.theo_theta * self.net_pos
+
+    @property
+    def pos_vega(self) -> float:
+        """"""
+        return self.theo_vega * self.net_pos
 
     def calculate_option_impv(self):
         """"""
@@ -142,73 +187,52 @@ class OptionData(InstrumentData):
             return
         underlying_price += self.underlying_adjustment
 
-        self.ask_impv = self.calculate_impv(
+        # Pricing functions are shared by all options of the portfolio, and
+        # time related values are precalculated by the chain
+        calculate_impv = self.portfolio.calculate_impv
+
+        self.ask_impv = calculate_impv(
             self.tick.ask_price_1,
             underlying_price,
             self.strike_price,
             self.interest_rate,
             self.time_to_expiry,
-            self.option_type
+            self.option_type,
+            min_time_value=self.pricetick,
+            sqrt_t=self.chain._sqrt_t,
+            discount=self.chain._discount
         )
 
-        self.bid_impv = self.calculate_impv(
+        self.bid_impv = calculate_impv(
             self.tick.bid_price_1,
             underlying_price,
             self.strike_price,
             self.interest_rate,
             self.time_to_expiry,
-            self.option_type
+            self.option_type,
+            min_time_value=self.pricetick,
+            sqrt_t=self.chain._sqrt_t,
+            discount=self.chain._discount
         )
 
         self.mid_impv = (self.ask_impv + self.bid_impv) / 2
         self.pricing_impv = self.mid_impv
 
-    def calculate_theo_greeks(self):
-        """"""
-        underlying_price = self.underlying.mid_price
-        if not underlying_price or not self.pricing_impv:
-            return
-        underlying_price += self.underlying_adjustment
-
-        self.theo_price, delta, gamma, theta, vega = self.calculate_greeks(
-            underlying_price,
-            self.strike_price,
-            self.interest_rate,
-            self.time_to_expiry,
-            self.pricing_impv,
-            self.option_type
-        )
-
-        self.theo_delta = delta * self.size
-        self.theo_gamma = gamma * self.size
-        self.theo_theta = theta * self.size
-        self.theo_vega = vega * self.size
-
-    def calculate_pos_greeks(self):
-        """"""
-        self.pos_value = self.theo_price * self.size * self.net_pos
-        self.pos_delta = self.theo_delta * self.net_pos
-        self.pos_gamma = self.theo_gamma * self.net_pos
-        self.pos_theta = self.theo_theta * self.net_pos
-        self.pos_vega = self.theo_vega * self.net_pos
-
     def update_tick(self, tick: TickData):
         """"""
         super().update_tick(tick)
+        self.chain.update_quote(self.row_index, tick)
         self.calculate_option_impv()
 
     def update_trade(self, trade: TradeData):
         """"""
         super().update_trade(trade)
-        self.calculate_pos_greeks()
+        self.chain.update_option_pos(self)
 
-    def update_underlying_tick(self, underlying_adjustment: float):
+    def update_holding(self, holding: PositionHolding):
         """"""
-        self.underlying_adjustment = underlying_adjustment
-
-        self.calculate_option_impv()
-        self.calculate_theo_greeks()
-        self.calculate_pos_greeks()
+        super().update_holding(holding)
+        self.chain.update_option_pos(self)
 
     def set_chain(self, chain: "ChainData"):
         """"""
@@ -222,35 +246,40 @@ class OptionData(InstrumentData):
         """"""
         self.interest_rate = interest_rate
 
-    def set_pricing_model(self, pricing_model: ModuleType):
-        """"""
-        self.calculate_greeks = pricing_model.calculate_greeks
-        self.calculate_impv = pricing_model.calculate_impv
-        self.calculate_price = pricing_model.calculate_price
-
 
 class UnderlyingData(InstrumentData):
     """"""
 
+    __slots__ = (
+        "theo_delta", "pos_delta", "chains", "row_index"
+    )
+
     def __init__(self, contract: ContractData):
         """"""
         super().__init__(contract)
 
         self.theo_delta: float = 0
         self.pos_delta: float = 0
-        self.chains: Dict[str: ChainData] = {}
+        self.chains: List[ChainData] = []
+
+        self.row_index: int = 0
 
     def add_chain(self, chain: "ChainData"):
         """"""
-        self.chains[chain.chain_symbol] = chain
+        if chain not in self.chains:
+            self.chains.append(chain)
 
     def update_tick(self, tick: TickData):
         """"""
         super().update_tick(tick)
 
         self.theo_delta = self.size * self.mid_price / 100
-        for chain in self.chains.values():
-            chain.update_underlying_tick()
+        chains = [
+            chain for chain in self.chains
+            if chain.check_recompute(self.mid_price)
+        ]
+        if chains:
+            self.portfolio.update_chains(chains)
 
         self.calculate_pos_greeks()
 
@@ -263,11 +292,28 @@ class UnderlyingData(InstrumentData):
     def calculate_pos_greeks(self):
         """"""
         self.pos_delta = self.theo_delta * self.net_pos
+        self.portfolio.save_underlying_delta(self)
 
 
 class ChainData:
     """"""
 
+    __slots__ = (
+        "chain_symbol", "long_pos", "short_pos", "net_pos", "pos_value",
+        "pos_delta", "pos_gamma", "pos_theta", "pos_vega", "underlying",
+        "options", "calls", "puts", "portfolio", "row_index", "indexes",
+        "_index_set", "atm_price", "atm_index", "underlying_adjustment",
+        "option_expiry", "days_to_expiry", "time_to_expiry", "interest_rate",
+        "_sqrt_t", "_discount", "pricing_model", "use_gpu", "_device_arrays",
+        "recompute_eps", "recompute_interval", "_last_recompute_mid",
+        "_tick_count", "_outdated", "_capacity", "_buffers", "_strike_price",
+        "_option_type", "_size", "_pricetick", "_time_to_expiry",
+        "_interest_rate", "_bid_price", "_ask_price", "_long_pos",
+        "_short_pos", "_net_pos", "_bid_impv", "_ask_impv", "_pricing_impv",
+        "_theo_price", "_theo_delta", "_theo_gamma", "_theo_theta",
+        "_theo_vega"
+    )
+
     def __init__(self, chain_symbol: str):
         """"""
         self.chain_symbol: str = chain_symbol
@@ -289,55 +335,271 @@ class ChainData:
         self.puts: Dict[float, OptionData] = {}
 
         self.portfolio: PortfolioData = None
+        self.row_index: int = 0
 
         self.indexes: List[float] = []
+        self._index_set: Set[float] = set()
         self.atm_price: float = 0
         self.atm_index: str = ""
         self.underlying_adjustment: float = 0
+
+        self.option_expiry: datetime = None
         self.days_to_expiry: int = 0
+        self.time_to_expiry: float = 0
+        self.interest_rate: float = 0
+
+        # Same for all options in the chain, only changes with time to
+        # expiry or interest rate
+        self._sqrt_t: float = 0
+        self._discount: float = 1
+
+        self.pricing_model: ModuleType = None
+
+        # Calculate chain on GPU with CuPy if enabled, with option arrays
+        # copied into GPU memory
+        self.use_gpu: bool = False
+        self._device_arrays: Dict[str, Any] = {}
+
+        # Skip recalculating chain if underlying price changed less than
+        # recompute_eps (default underlying pricetick), and only recalculate
+        # once every recompute_interval underlying ticks. Chain is always
+        # recalculated on next underlying tick if outdated by other changes
+        # (option quote, interest rate, time to expiry, etc.)
+        self.recompute_eps: float = 0
+        self.recompute_interval: int = 1
+        self._last_recompute_mid: float = 0
+        self._tick_count: int = 0
+        self._outdated: bool = True
+
+        # Option data stored as arrays (one row per option, in the same
+        # order as options dict) for calculating the whole chain in batch.
+        # Arrays are views of buffers with spare capacity for adding options,
+        # so they must be updated in place instead of replaced.
+        self._capacity: int = 0
+        self._buffers: Dict[str, ndarray] = {}
+
+        self._strike_price: ndarray = np.zeros(0)
+        self._option_type: ndarray = np.zeros(0)
+        self._size: ndarray = np.zeros(0)
+        self._pricetick: ndarray = np.zeros(0)
+        self._time_to_expiry: ndarray = np.zeros(0)
+        self._interest_rate: ndarray = np.zeros(0)
+        self._bid_price: ndarray = np.zeros(0)
+        self._ask_price: ndarray = np.zeros(0)
+        self._long_pos: ndarray = np.zeros(0)
+        self._short_pos: ndarray = np.zeros(0)
+        self._net_pos: ndarray = np.zeros(0)
+
+        self._bid_impv: ndarray = np.zeros(0)
+        self._ask_impv: ndarray = np.zeros(0)
+        self._pricing_impv: ndarray = np.zeros(0)
+        self._theo_price: ndarray = np.zeros(0)
+        self._theo_delta: ndarray = np.zeros(0)
+        self._theo_gamma: ndarray = np.zeros(0)
+        self._theo_theta: ndarray = np.zeros(0)
+        self._theo_vega: ndarray = np.zeros(0)
 
     def add_option(self, option: OptionData):
         """"""
+        if option.vt_symbol not in self.options:
+            self._extend_arrays(1)
+
+        self._set_option(option)
+
+        if option.chain_index not in self._index_set:
+            bisect.insort(self.indexes, option.chain_index)
+            self._index_set.add(option.chain_index)
+
+    def add_options_bulk(self, options: List[OptionData]):
+        """Add options with arrays extended and indexes sorted only once"""
+        new_symbols = set(option.vt_symbol for option in options)
+        new_symbols.difference_update(self.options.keys())
+        self._extend_arrays(len(new_symbols))
+
+        for option in options:
+            self._set_option(option)
+
+        new_indexes = set(option.chain_index for option in options)
+        new_indexes.difference_update(self._index_set)
+
+        if new_indexes:
+            self.indexes.extend(new_indexes)
+            self.indexes.sort()
+            self._index_set.update(new_indexes)
+
+    def _set_option(self, option: OptionData):
+        """Save option data into dicts and arrays"""
+        # Replace existing option in the same row
+        old_option = self.options.get(option.vt_symbol, None)
+        if old_option:
+            option.row_index = old_option.row_index
+        else:
+            option.row_index = len(self.options)
+
         self.options[option.vt_symbol] = option
 
+        if not self.option_expiry:
+            self.option_expiry = option.option_expiry
+            self.calculate_time_to_expiry()
+
+        row = option.row_index
+        self._strike_price[row] = option.strike_price
+        self._option_type[row] = option.option_type
+        self._size[row] = option.size
+        self._pricetick[row] = option.pricetick
+        self._time_to_expiry[row] = self.time_to_expiry
+        self._interest_rate[row] = self.interest_rate
+        self._long_pos[row] = option.long_pos
+        self._short_pos[row] = option.short_pos
+        self._net_pos[row] = option.net_pos
+
         if option.option_type > 0:
             self.calls[option.chain_index] = option
         else:
             self.puts[option.chain_index] = option
 
         option.set_chain(self)
+        option.set_interest_rate(self.interest_rate)
 
-        if option.chain_index not in self.indexes:
-            self.indexes.append(option.chain_index)
-            self.indexes.sort()
+        # Option arrays in GPU memory are outdated
+        self._device_arrays = {}
+        self._outdated = True
 
-        self.days_to_expiry = option.days_to_expiry
+    def calculate_time_to_expiry(self):
+        """Update time to expiry of all options in the chain"""
+        # Chain without option added yet has no expiry
+        if not self.option_expiry:
+            return
+
+        self.days_to_expiry = calculate_days_to_expiry(self.option_expiry)
+        self.time_to_expiry = self.days_to_expiry / ANNUAL_DAYS
+        self._time_to_expiry.fill(self.time_to_expiry)
+
+        self.calculate_time_values()
+        self._outdated = True
+
+    def calculate_time_values(self):
+        """Update square root of time and discount factor of the chain"""
+        self._sqrt_t = sqrt(self.time_to_expiry)
+        self._discount = exp(-self.interest_rate * self.time_to_expiry)
+
+    def _extend_arrays(self, count: int):
+        """Add new rows to all option arrays"""
+        if not count:
+            return
+
+        names = [
+            "_strike_price", "_option_type", "_size", "_pricetick",
+            "_time_to_expiry", "_interest_rate",
+            "_bid_price", "_ask_price",
+            "_long_pos", "_short_pos", "_net_pos",
+            "_bid_impv", "_ask_impv", "_pricing_impv",
+            "_theo_price", "_theo_delta", "_theo_gamma",
+            "_theo_theta", "_theo_vega"
+        ]
+
+        rows = self._strike_price.shape[0]
+        size = rows + count
+
+        # Double buffer capacity when full, so that adding options one by
+        # one only copies existing rows a few times
+        if size > self._capacity:
+            self._capacity = max(size, self._capacity * 2)
+
+            for name in names:
+                buffer = np.zeros(self._capacity)
+                buffer[:rows] = getattr(self, name)
+                self._buffers[name] = buffer
+
+        for name in names:
+            setattr(self, name, self._buffers[name][:size])
+
+    def update_quote(self, row_index: int, tick: TickData):
+        """Update option quote price in arrays"""
+        self._bid_price[row_index] = tick.bid_price_1
+        self._ask_price[row_index] = tick.ask_price_1
+        self._outdated = True
+
+    def calculate_option_impv(self, underlying_price: float):
+        """Calculate implied volatility of all options in one batch"""
+        calculate_impv_array = self.pricing_model.calculate_impv_array
+
+        self._bid_impv[:] = calculate_impv_array(
+            self._bid_price,
+            underlying_price,
+            self._strike_price,
+            self._interest_rate,
+            self._time_to_expiry,
+            self._option_type,
+            min_time_value=self._pricetick,
+            sqrt_t=self._sqrt_t,
+            discount=self._discount
+        )
+
+        self._ask_impv[:] = calculate_impv_array(
+            self._ask_price,
+            underlying_price,
+            self._strike_price,
+            self._interest_rate,
+            self._time_to_expiry,
+            self._option_type,
+            min_time_value=self._pricetick,
+            sqrt_t=self._sqrt_t,
+            discount=self._discount
+        )
+
+        self._pricing_impv[:] = (self._bid_impv + self._ask_impv) / 2
+
+    def calculate_theo_greeks(self, underlying_price: float):
+        """Calculate price and greeks of all options in one batch"""
+        # Options without valid implied volatility keep old value
+        mask = self._pricing_impv > 0
+        if not mask.any():
+            return
+
+        price, delta, gamma, theta, vega = self.pricing_model.calculate_greeks_array(
+            underlying_price,
+            self._strike_price[mask],
+            self._interest_rate[mask],
+            self._time_to_expiry[mask],
+            self._pricing_impv[mask],
+            self._option_type[mask],
+            sqrt_t=self._sqrt_t,
+            discount=self._discount
+        )
+
+        size = self._size[mask]
+        self._theo_price[mask] = price
+        self._theo_delta[mask] = delta * size
+        self._theo_gamma[mask] = gamma * size
+        self._theo_theta[mask] = theta * size
+        self._theo_vega[mask] = vega * size
+
+    def update_option_pos(self, option: OptionData):
+        """Save option pos into arrays and update chain total"""
+        row = option.row_index
+        self._long_pos[row] = option.long_pos
+        self._short_pos[row] = option.short_pos
+        self._net_pos[row] = option.net_pos
+
+        self.calculate_pos_greeks()
 
     def calculate_pos_greeks(self):
         """"""
-        # Clear data
-        self.long_pos = 0
-        self.short_pos = 0
-        self.net_pos = 0
-        self.pos_value = 0
-        self.pos_delta = 0
-        self.pos_gamma = 0
-        self.pos_theta = 0
-        self.pos_vega = 0
-
-        # Sum all value
-        for option in self.options.values():
-            if option.net_pos:
-                self.long_pos += option.long_pos
-                self.short_pos += option.short_pos
-                self.pos_value += option.pos_value
-                self.pos_delta += option.pos_delta
-                self.pos_gamma += option.pos_gamma
-                self.pos_theta += option.pos_theta
-                self.pos_vega += option.pos_vega
-
+        self.long_pos = int(self._long_pos.sum())
+        self.short_pos = int(self._short_pos.sum())
         self.net_pos = self.long_pos - self.short_pos
 
+        # Options without position have zero weight in dot product
+        net_pos = self._net_pos
+        self.pos_value = float(np.dot(net_pos * self._size, self._theo_price))
+        self.pos_delta = float(np.dot(net_pos, self._theo_delta))
+        self.pos_gamma = float(np.dot(net_pos, self._theo_gamma))
+        self.pos_theta = float(np.dot(net_pos, self._theo_theta))
+        self.pos_vega = float(np.dot(net_pos, self._theo_vega))
+
+        self.portfolio.save_chain_greeks(self)
+
     def update_tick(self, tick: TickData):
         """"""
         option = self.options[tick.vt_symbol]
@@ -345,59 +607,156 @@ class ChainData:
 
     def update_underlying_tick(self):
         """"""
-        for option in self.options.values():
-            option.update_underlying_tick(self.underlying_adjustment)
+        underlying_price = self.underlying.mid_price
+        if not underlying_price:
+            return
+
+        self._last_recompute_mid = underlying_price
+        self._tick_count = 0
+        self._outdated = False
+
+        underlying_price += self.underlying_adjustment
+
+        if self.use_gpu:
+            self._recompute_all_gpu(underlying_price)
+        else:
+            self._recompute_all(underlying_price)
+
+    def check_recompute(self, underlying_price: float) -> bool:
+        """Check if underlying tick is worth recalculating the chain"""
+        if self._outdated:
+            return True
+
+        self._tick_count += 1
+        if self._tick_count < self.recompute_interval:
+            return False
+
+        # Round price change to avoid float error against pricetick
+        price_change = round(abs(underlying_price - self._last_recompute_mid), 8)
+        if price_change < self.recompute_eps:
+            return False
+
+        return True
+
+    def _recompute_all(self, underlying_price: float):
+        """Recalculate implied volatility and greeks of the whole chain"""
+        self.calculate_option_impv(underlying_price)
+        self.calculate_theo_greeks(underlying_price)
+
+        self._update_options()
+
+    def _recompute_all_gpu(self, underlying_price: float):
+        """Recalculate implied volatility and greeks of the whole chain on GPU"""
+        # Use CPU for pricing model without GPU support
+        calculate_chain_gpu = getattr(self.pricing_model, "calculate_chain_gpu", None)
+        if not calculate_chain_gpu:
+            self._device_arrays = {}
+            self._recompute_all(underlying_price)
+            return
+
+        if not self._device_arrays:
+            self.to_device()
+
+        results = calculate_chain_gpu(
+            self._device_arrays,
+            self._bid_price,
+            self._ask_price,
+            underlying_price,
+            self.interest_rate,
+            self.time_to_expiry,
+            self._sqrt_t,
+            self._discount
+        )
+
+        for array, result in zip(
+            [
+                self._bid_impv,
+                self._ask_impv,
+                self._pricing_impv,
+                self._theo_price,
+                self._theo_delta,
+                self._theo_gamma,
+                self._theo_theta,
+                self._theo_vega
+            ],
+            results
+        ):
+            array[:] = result
+
+        self._update_options()
+
+    def to_device(self):
+        """Copy option arrays into GPU memory"""
+        self._device_arrays = {
+            name: to_device(getattr(self, name))
+            for name in [
+                "_strike_price", "_option_type", "_size", "_pricetick",
+                "_theo_price", "_theo_delta", "_theo_gamma",
+                "_theo_theta", "_theo_vega"
+            ]
+        }
+
+    def _update_options(self):
+        """Write batch result back to options and update pos greeks"""
+        # Options are in the same order as arrays
+        for option, bid_impv, ask_impv, pricing_impv, price, delta, gamma, theta, vega in zip(
+            self.options.values(),
+            self._bid_impv.tolist(),
+            self._ask_impv.tolist(),
+            self._pricing_impv.tolist(),
+            self._theo_price.tolist(),
+            self._theo_delta.tolist(),
+            self._theo_gamma.tolist(),
+            self._theo_theta.tolist(),
+            self._theo_vega.tolist()
+        ):
+            option.underlying_adjustment = self.underlying_adjustment
+            option.bid_impv = bid_impv
+            option.ask_impv = ask_impv
+            option.mid_impv = pricing_impv
+            option.pricing_impv = pricing_impv
+            option.theo_price = price
+            option.theo_delta = delta
+            option.theo_gamma = gamma
+            option.theo_theta = theta
+            option.theo_vega = vega
 
         self.calculate_pos_greeks()
 
     def update_trade(self, trade: TradeData):
         """"""
         option = self.options[trade.vt_symbol]
-
-        # Deduct old option pos greeks
-        self.long_pos -= option.long_pos
-        self.short_pos -= option.short_pos
-        self.pos_value -= option.pos_value
-        self.pos_delta -= option.pos_delta
-        self.pos_gamma -= option.pos_gamma
-        self.pos_theta -= option.pos_theta
-        self.pos_vega -= option.pos_vega
-
-        # Calculate new option pos greeks
         option.update_trade(trade)
 
-        # Add new option pos greeks
-        self.long_pos += option.long_pos
-        self.short_pos += option.short_pos
-        self.pos_value += option.pos_value
-        self.pos_delta += option.pos_delta
-        self.pos_gamma += option.pos_gamma
-        self.pos_theta += option.pos_theta
-        self.pos_vega += option.pos_vega
-
-        self.net_pos = self.long_pos - self.short_pos
-
     def set_underlying(self, underlying: "UnderlyingData"):
         """"""
         underlying.add_chain(self)
         self.underlying = underlying
+        self.recompute_eps = underlying.pricetick
 
         for option in self.options.values():
             option.set_underlying(underlying)
 
     def set_interest_rate(self, interest_rate: float):
         """"""
+        self.interest_rate = interest_rate
+        self._interest_rate.fill(interest_rate)
+        self.calculate_time_values()
+        self._outdated = True
+
         for option in self.options.values():
             option.set_interest_rate(interest_rate)
 
     def set_pricing_model(self, pricing_model: ModuleType):
         """"""
-        for option in self.options.values():
-            option.set_pricing_model(pricing_model)
+        self.pricing_model = pricing_model
+        self._outdated = True
 
     def set_portfolio(self, portfolio: "PortfolioData"):
         """"""
-        for option in self.options:
+        self.portfolio = portfolio
+
+        for option in self.options.values():
             option.set_portfolio(portfolio)
 
     def calculate_atm_price(self):
@@ -426,11 +785,24 @@ class ChainData:
         atm_put = self.puts[self.atm_index]
 
         synthetic_price = atm_call.mid_price - atm_put.mid_price + self.atm_price
-        self.underlying_adjustment = synthetic_price - self.underlying.mid_price
+        self.set_underlying_adjustment(synthetic_price - self.underlying.mid_price)
+
+    def set_underlying_adjustment(self, underlying_adjustment: float):
+        """"""
+        self.underlying_adjustment = underlying_adjustment
+        self._outdated = True
 
 
 class PortfolioData:
 
+    __slots__ = (
+        "name", "long_pos", "short_pos", "net_pos", "pos_value", "pos_delta",
+        "pos_gamma", "pos_theta", "pos_vega", "_options", "_chains",
+        "options", "chains", "underlyings", "instruments", "_chain_greeks",
+        "_underlying_deltas", "_chain_total", "_underlying_total",
+        "_total_lock", "_pool", "pricing_model", "_cached_impv"
+    )
+
     def __init__(self, name: str):
         """"""
         self.name: str = name
@@ -439,6 +811,7 @@ class PortfolioData:
         self.short_pos: int = 0
         self.net_pos: int = 0
 
+        self.pos_value: float = 0
         self.pos_delta: float = 0
         self.pos_gamma: float = 0
         self.pos_theta: float = 0
@@ -453,55 +826,146 @@ class PortfolioData:
         self.chains: Dict[str, ChainData] = {}
         self.underlyings: Dict[str, UnderlyingData] = {}
 
-    def calculate_pos_greeks(self):
-        """"""
-        self.long_pos = 0
-        self.short_pos = 0
-        self.net_pos = 0
+        # Active options and underlyings for dispatching tick and trade
+        self.instruments: Dict[str, InstrumentData] = {}
 
-        self.pos_value = 0
-        self.pos_delta = 0
-        self.pos_gamma = 0
-        self.pos_theta = 0
-        self.pos_vega = 0
+        # Pos data of each chain (one row per chain, in columns of long pos,
+        # short pos, value, delta, gamma, theta and vega) and pos delta of
+        # each underlying, for summing up portfolio total in batch
+        self._chain_greeks: ndarray = np.zeros((0, 7))
+        self._underlying_deltas: ndarray = np.zeros(0)
 
-        for underlying in self.underlyings.values():
-            self.pos_delta += underlying.pos_delta
+        # Running totals of above arrays, updated with difference of the
+        # saved row (under lock as chains may be saved by pool threads)
+        self._chain_total: ndarray = np.zeros(7)
+        self._underlying_total: float = 0
+        self._total_lock: Lock = Lock()
 
-        for chain in self.chains.values():
-            self.long_pos += chain.long_pos
-            self.short_pos += chain.short_pos
-            self.pos_value += chain.pos_value
-            self.pos_delta += chain.pos_delta
-            self.pos_gamma += chain.pos_gamma
-            self.pos_theta += chain.pos_theta
-            self.pos_vega += chain.pos_vega
+        # Thread pool for recalculating chains in parallel
+        self._pool: ThreadPoolExecutor = None
+
+        # Pricing model shared by all options
+        self.pricing_model: ModuleType = None
+        self._cached_impv: Callable = None
 
+    def calculate_pos_greeks(self):
+        """Sum up pos greeks of all chains and underlyings from scratch"""
+        # Only active chains can have pos, so rows of others are all zero
+        with self._total_lock:
+            self._chain_total = self._chain_greeks.sum(axis=0)
+            self._underlying_total = float(self._underlying_deltas.sum())
+
+        self.update_pos_greeks()
+
+    def update_pos_greeks(self):
+        """Update pos greeks from running totals"""
+        (
+            long_pos,
+            short_pos,
+            self.pos_value,
+            pos_delta,
+            self.pos_gamma,
+            self.pos_theta,
+            self.pos_vega
+        ) = self._chain_total.tolist()
+
+        self.long_pos = int(long_pos)
+        self.short_pos = int(short_pos)
         self.net_pos = self.long_pos - self.short_pos
 
+        self.pos_delta = pos_delta + self._underlying_total
+
+    def calculate_impv(
+        self,
+        price: float,
+        s: float,
+        k: float,
+        r: float,
+        t: float,
+        cp: int,
+        min_time_value: float = 0,
+        sqrt_t: float = 0.0,
+        discount: float = 0.0
+    ) -> float:
+        """Calculate implied volatility with cache of recent results"""
+        # Round prices so that repeated quotes hit the cache despite float
+        # error, other inputs are exact contract or chain data
+        return self._cached_impv(
+            round(price, 6),
+            round(s, 6),
+            k,
+            r,
+            t,
+            cp,
+            min_time_value=min_time_value,
+            sqrt_t=sqrt_t,
+            discount=discount
+        )
+
+    def update_chains(self, chains: List[ChainData]):
+        """Recalculate chains on underlying tick, in parallel if possible"""
+        # cpu_count() returns None if undetermined
+        cpu_count = os.cpu_count() or 1
+
+        if len(chains) == 1 or cpu_count == 1:
+            for chain in chains:
+                chain.update_underlying_tick()
+            return
+
+        if not self._pool:
+            max_workers = min(cpu_count, len(self.chains))
+            self._pool = ThreadPoolExecutor(max_workers=max_workers)
+
+        list(self._pool.map(ChainData.update_underlying_tick, chains))
+
+    def close(self):
+        """"""
+        if self._pool:
+            self._pool.shutdown()
+            self._pool = None
+
+    def save_chain_greeks(self, chain: ChainData):
+        """Save chain pos data into its row of portfolio array"""
+        data = np.array((
+            chain.long_pos,
+            chain.short_pos,
+            chain.pos_value,
+            chain.pos_delta,
+            chain.pos_gamma,
+            chain.pos_theta,
+            chain.pos_vega
+        ))
+
+        with self._total_lock:
+            self._chain_total += data - self._chain_greeks[chain.row_index]
+            self._chain_greeks[chain.row_index] = data
+
+    def save_underlying_delta(self, underlying: UnderlyingData):
+        """Save underlying pos delta into portfolio array"""
+        row = underlying.row_index
+
+        with self._total_lock:
+            old_delta = float(self._underlying_deltas[row])
+            self._underlying_total += underlying.pos_delta - old_delta
+            self._underlying_deltas[row] = underlying.pos_delta
+
     def update_tick(self, tick: TickData):
         """"""
-        if tick.vt_symbol in self.options:
-            option = self.options[tick.vt_symbol]
-            chain = option.chain
-            chain.update_tick(tick)
-            self.calculate_pos_greeks()
-        elif tick.vt_symbol in self.underlyings:
-            underlying = self.underlyings[tick.vt_symbol]
-            underlying.update_tick(tick)
-            self.calculate_pos_greeks()
+        instrument = self.instruments.get(tick.vt_symbol, None)
+        if not instrument:
+            return
+
+        instrument.update_tick(tick)
+        self.update_pos_greeks()
 
     def update_trade(self, trade: TradeData):
         """"""
-        if trade.vt_symbol in self.options:
-            option = self.options[trade.vt_symbol]
-            chain = option.chain
-            chain.update_trade(trade)
-            self.calculate_pos_greeks()
-        elif trade.vt_symbol in self.underlyings:
-            underlying = self.underlyings[trade.vt_symbol]
-            underlying.update_trade(trade)
-            self.calculate_pos_greeks()
+        instrument = self.instruments.get(trade.vt_symbol, None)
+        if not instrument:
+            return
+
+        instrument.update_trade(trade)
+        self.update_pos_greeks()
 
     def set_interest_rate(self, interest_rate: float):
         """"""
@@ -510,6 +974,9 @@ class PortfolioData:
 
     def set_pricing_model(self, pricing_model: ModuleType):
         """"""
+        self.pricing_model = pricing_model
+        self._cached_impv = lru_cache(maxsize=1024)(pricing_model.calculate_impv)
+
         for chain in self.chains.values():
             chain.set_pricing_model(pricing_model)
 
@@ -519,7 +986,12 @@ class PortfolioData:
         if not underlying:
             underlying = UnderlyingData(contract)
             underlying.set_portfolio(self)
+
+            underlying.row_index = len(self.underlyings)
+            self._underlying_deltas = np.append(self._underlying_deltas, 0)
+
             self.underlyings[contract.vt_symbol] = underlying
+            self.instruments[contract.vt_symbol] = underlying
 
         chain = self.get_chain(chain_symbol)
         chain.set_underlying(underlying)
@@ -529,6 +1001,7 @@ class PortfolioData:
 
         for option in chain.options.values():
             self.options[option.vt_symbol] = option
+            self.instruments[option.vt_symbol] = option
 
     def get_chain(self, chain_symbol: str) -> ChainData:
         """"""
@@ -537,23 +1010,54 @@ class PortfolioData:
         if not chain:
             chain = ChainData(chain_symbol)
             chain.set_portfolio(self)
+
+            chain.row_index = len(self._chains)
+            self._chain_greeks = np.vstack((self._chain_greeks, np.zeros(7)))
+
             self._chains[chain_symbol] = chain
 
         return chain
 
     def add_option(self, contract: ContractData):
         """"""
-        option = OptionData(contract)
-        option.set_portfolio(self)
-        self._options[contract.vt_symbol] = option
+        self.add_options([contract])
 
-        exchange_name = contract.exchange.value
-        chain_symbol: str = f"{contract.option_underlying}.{exchange_name}"
+    def add_options(self, contracts: List[ContractData]):
+        """Add options grouped by chain, so that each chain is updated once"""
+        chain_options: Dict[str, List[OptionData]] = defaultdict(list)
 
-        chain = self.get_chain(chain_symbol)
-        chain.add_option(option)
+        for contract in contracts:
+            option = OptionData(contract)
+            option.set_portfolio(self)
+            self._options[contract.vt_symbol] = option
+
+            exchange_name = contract.exchange.value
+            chain_symbol: str = f"{contract.option_underlying}.{exchange_name}"
+            chain_options[chain_symbol].append(option)
+
+        # Time to expiry is calculated by chain once for all its options,
+        # and single option is inserted without extending arrays in bulk
+        for chain_symbol, options in chain_options.items():
+            chain = self.get_chain(chain_symbol)
+
+            if len(options) == 1:
+                chain.add_option(options[0])
+            else:
+                chain.add_options_bulk(options)
+
+    def set_use_gpu(self, use_gpu: bool):
+        """Calculate chains on GPU, only if CuPy is installed"""
+        use_gpu = use_gpu and CUPY_AVAILABLE
+
+        for chain in self.chains.values():
+            chain.use_gpu = use_gpu
 
     def calculate_atm_price(self):
         """"""
         for chain in self.chains.values():
             chain.calculate_atm_price()
+
+    def calculate_time_to_expiry(self):
+        """"""
+        for chain in self._chains.values():
+            chain.calculate_time_to_expiry()
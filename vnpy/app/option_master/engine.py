@@ -62,6 +62,9 @@ class OptionEngine(BaseEngine):
         """"""
         self.save_setting()
 
+        for portfolio in self.portfolios.values():
+            portfolio.close()
+
     def load_setting(self):
         """"""
         self.setting = load_json(self.setting_filename)
@@ -152,6 +155,10 @@ class OptionEngine(BaseEngine):
 
         for portfolio in self.active_portfolios.values():
             portfolio.calculate_atm_price()
+            portfolio.calculate_time_to_expiry()
+
+            # Clear float error accumulated in running totals
+            portfolio.calculate_pos_greeks()
 
     def get_portfolio(self, portfolio_name: str) -> PortfolioData:
         """"""
@@ -240,14 +247,17 @@ class OptionEngine(BaseEngine):
 
         portfolio.calculate_pos_greeks()
 
+        # Calculate on GPU if enabled in setting (CPU by default)
+        portfolio.set_use_gpu(self.setting.get("use_gpu", False))
+
         # Load underlying adjustment from setting
         adjustment_settings = self.setting.get("underlying_adjustments", {})
         adjustment_setting = adjustment_settings.get(portfolio_name)
 
         if adjustment_setting:
             for chain in portfolio.chains.values():
-                chain.underlying_adjustment = adjustment_setting.get(
-                    chain.chain_symbol, 0
+                chain.set_underlying_adjustment(
+                    adjustment_setting.get(chain.chain_symbol, 0)
                 )
 
         return True
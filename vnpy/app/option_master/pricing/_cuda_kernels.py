@@ -0,0 +1,259 @@
+"""
+CUDA kernel for calculating implied volatility and greeks of a whole
+option chain on GPU with CuPy, using the same math as numba kernels. Both
+Black-Scholes (stock option) and Black-76 (futures option) are supported
+with the black76 flag.
+
+CuPy is an optional dependency, CUPY_AVAILABLE is False if not installed
+and option chains will be calculated on CPU.
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+try:
+    import cupy
+    CUPY_AVAILABLE = True
+except ImportError:
+    cupy = None
+    CUPY_AVAILABLE = False
+
+
+THREADS_PER_BLOCK = 256
+
+KERNEL_SOURCE = r"""
+#define PI 3.141592653589793
+#define SQRT_2PI 2.5066282746310002
+
+__device__ double norm_pdf(double x)
+{
+    return exp(-0.5 * x * x) / SQRT_2PI;
+}
+
+__device__ void calculate_price_vega(
+    double s, double k, double r, double t, double v, double cp,
+    double sqrt_t, double discount, int black76,
+    double* price, double* vega, double* d1, double* d2
+)
+{
+    if (black76) {
+        *d1 = (log(s / k) + 0.5 * v * v * t) / (v * sqrt_t);
+        *d2 = *d1 - v * sqrt_t;
+        *price = cp * (s * normcdf(cp * *d1) - k * normcdf(cp * *d2)) * discount;
+        *vega = s * discount * norm_pdf(*d1) * sqrt_t;
+    } else {
+        *d1 = (log(s / k) + (r + 0.5 * v * v) * t) / (v * sqrt_t);
+        *d2 = *d1 - v * sqrt_t;
+        *price = cp * (s * normcdf(cp * *d1) - k * normcdf(cp * *d2) * discount);
+        *vega = s * norm_pdf(*d1) * sqrt_t;
+    }
+}
+
+__device__ double calculate_impv(
+    double price, double s, double k, double r, double t, double cp,
+    double min_time_value, double sqrt_t, double discount, int black76
+)
+{
+    // Check option price must be positive and meets minimum value
+    if (price <= 0) {
+        return 0.0;
+    }
+
+    if (cp == 1 && price <= (s - k) * discount + min_time_value) {
+        return 0.0;
+    }
+    else if (cp == -1 && price <= k * discount - s + min_time_value) {
+        return 0.0;
+    }
+
+    // Estimate initial guess with Corrado-Miller approximation
+    double f = black76 ? s : s / discount;
+    double c = price / discount;
+    if (cp == -1) {
+        c += f - k;
+    }
+
+    double a = c - (f - k) / 2;
+    double b = fmax(a * a - (f - k) * (f - k) / PI, 0.0);
+    double v = SQRT_2PI / (f + k) * (a + sqrt(b)) / sqrt_t;
+    if (!(v > 0)) {
+        v = 0.3;
+    }
+
+    // Calculate implied volatility with Halley's method
+    double p, vega, d1, d2;
+
+    for (int i = 0; i < 50; i++) {
+        calculate_price_vega(
+            s, k, r, t, v, cp, sqrt_t, discount, black76, &p, &vega, &d1, &d2
+        );
+
+        if (vega < 1e-10) {
+            break;
+        }
+
+        double diff = price - p;
+        double denominator = vega + 0.5 * diff * d1 * d2 / v;
+        double dx = denominator > 0 ? diff / denominator : diff / vega;
+
+        if (fabs(dx) < 0.00001) {
+            break;
+        }
+
+        if (v + dx > 0) {
+            v += dx;
+        } else {
+            v /= 2;
+        }
+    }
+
+    if (v <= 0) {
+        return 0.0;
+    }
+
+    // Round to 4 decimal places
+    return rint(v * 10000.0) / 10000.0;
+}
+
+extern "C" __global__ void recompute_chain(
+    const double* bid_price, const double* ask_price, const double* strike_price,
+    const double* option_type, const double* size, const double* pricetick,
+    double s, double r, double t, double sqrt_t, double discount,
+    int black76, int annual_days, int n,
+    double* bid_impv, double* ask_impv, double* pricing_impv,
+    double* theo_price, double* theo_delta, double* theo_gamma,
+    double* theo_theta, double* theo_vega
+)
+{
+    int i = blockDim.x * blockIdx.x + threadIdx.x;
+    if (i >= n) {
+        return;
+    }
+
+    double k = strike_price[i];
+    double cp = option_type[i];
+
+    bid_impv[i] = calculate_impv(
+        bid_price[i], s, k, r, t, cp, pricetick[i], sqrt_t, discount, black76
+    );
+    ask_impv[i] = calculate_impv(
+        ask_price[i], s, k, r, t, cp, pricetick[i], sqrt_t, discount, black76
+    );
+
+    double v = (bid_impv[i] + ask_impv[i]) / 2;
+    pricing_impv[i] = v;
+
+    // Options without valid implied volatility keep old value
+    if (v <= 0) {
+        return;
+    }
+
+    double d1;
+    if (black76) {
+        d1 = (log(s / k) + 0.5 * v * v * t) / (v * sqrt_t);
+    } else {
+        d1 = (log(s / k) + (r + 0.5 * v * v) * t) / (v * sqrt_t);
+    }
+    double d2 = d1 - v * sqrt_t;
+
+    double cdf_d1 = normcdf(cp * d1);
+    double cdf_d2 = normcdf(cp * d2);
+    double pdf_d1 = norm_pdf(d1);
+    double m = size[i];
+
+    if (black76) {
+        theo_price[i] = cp * (s * cdf_d1 - k * cdf_d2) * discount;
+        theo_delta[i] = cp * discount * cdf_d1 * s * 0.01 * m;
+        theo_gamma[i] = discount * pdf_d1 / (v * sqrt_t) * s * 0.0001 * m;
+        theo_theta[i] = (
+            -s * discount * pdf_d1 * v / (2 * sqrt_t)
+            + cp * r * s * discount * cdf_d1
+            - cp * r * k * discount * cdf_d2
+        ) / annual_days * m;
+        theo_vega[i] = s * discount * pdf_d1 * sqrt_t / 100 * m;
+    } else {
+        theo_price[i] = cp * (s * cdf_d1 - k * cdf_d2 * discount);
+        theo_delta[i] = cp * cdf_d1 * s * 0.01 * m;
+        theo_gamma[i] = pdf_d1 / (v * sqrt_t) * s * 0.0001 * m;
+        theo_theta[i] = (
+            -s * pdf_d1 * v / (2 * sqrt_t)
+            - cp * r * k * discount * cdf_d2
+        ) / annual_days * m;
+        theo_vega[i] = s * pdf_d1 * sqrt_t / 100 * m;
+    }
+}
+"""
+
+if CUPY_AVAILABLE:
+    # Compiled on first launch
+    recompute_kernel = cupy.RawKernel(KERNEL_SOURCE, "recompute_chain")
+
+
+def to_device(array: ndarray) -> "cupy.ndarray":
+    """Copy C-contiguous float64 array into GPU memory"""
+    return cupy.asarray(np.ascontiguousarray(array, dtype=np.float64))
+
+
+def calculate_chain(
+    device_arrays: Dict[str, "cupy.ndarray"],
+    bid_price: ndarray,
+    ask_price: ndarray,
+    s: float,
+    r: float,
+    t: float,
+    sqrt_t: float,
+    discount: float,
+    black76: bool,
+    annual_days: int = 240
+) -> Tuple[ndarray, ...]:
+    """
+    Calculate implied volatility and greeks of option chain with kernel.
+
+    Return bid/ask/pricing impv and theo price/delta/gamma/theta/vega
+    arrays (greeks multiplied by contract size) copied back from GPU.
+    """
+    theo_arrays = [
+        device_arrays["_theo_price"],
+        device_arrays["_theo_delta"],
+        device_arrays["_theo_gamma"],
+        device_arrays["_theo_theta"],
+        device_arrays["_theo_vega"]
+    ]
+
+    n = bid_price.shape[0]
+    bid_impv = cupy.zeros(n)
+    ask_impv = cupy.zeros(n)
+    pricing_impv = cupy.zeros(n)
+
+    if n:
+        blocks = (n + THREADS_PER_BLOCK - 1) // THREADS_PER_BLOCK
+        recompute_kernel(
+            (blocks,),
+            (THREADS_PER_BLOCK,),
+            (
+                to_device(bid_price),
+                to_device(ask_price),
+                device_arrays["_strike_price"],
+                device_arrays["_option_type"],
+                device_arrays["_size"],
+                device_arrays["_pricetick"],
+                np.float64(s),
+                np.float64(r),
+                np.float64(t),
+                np.float64(sqrt_t),
+                np.float64(discount),
+                np.int32(black76),
+                np.int32(annual_days),
+                np.int32(n),
+                bid_impv,
+                ask_impv,
+                pricing_impv,
+                *theo_arrays
+            )
+        )
+
+    return tuple(
+        array.get() for array in [bid_impv, ask_impv, pricing_impv, *theo_arrays]
+    )
@@ -0,0 +1,532 @@
+"""
+Numba compiled kernels for calculating implied volatility and greeks of
+option arrays in batch. Both Black-Scholes (stock option) and Black-76
+(futures option) are supported with the black76 flag.
+
+Batch kernels release the GIL so that different option chains can be
+calculated in parallel threads.
+
+Numba is an optional dependency, NUMBA_AVAILABLE is False if not installed
+and pricing models will use numpy implementation at the end of this module
+instead, which evaluates log/exp of arrays with numexpr if installed.
+"""
+
+from math import log, sqrt, exp, erfc, pi
+from typing import Tuple
+
+import numpy as np
+from numpy import ndarray
+from scipy import special
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback decorator to keep functions as pure python"""
+        def decorator(func):
+            return func
+        return decorator
+
+# Use numexpr for vectorized log/exp of arrays if installed
+try:
+    import numexpr
+    NUMEXPR_AVAILABLE = True
+except ImportError:
+    NUMEXPR_AVAILABLE = False
+
+
+SQRT_2 = sqrt(2)
+SQRT_2PI = sqrt(2 * pi)
+
+
+@njit(cache=True, fastmath=True)
+def norm_cdf(x: float) -> float:
+    """Standard normal cumulative distribution with erfc"""
+    return 0.5 * erfc(-x / SQRT_2)
+
+
+@njit(cache=True, fastmath=True)
+def norm_pdf(x: float) -> float:
+    """Standard normal probability density"""
+    return exp(-0.5 * x * x) / SQRT_2PI
+
+
+@njit(cache=True, fastmath=True)
+def calculate_price_vega(
+    s: float,
+    k: float,
+    r: float,
+    t: float,
+    v: float,
+    cp: float,
+    sqrt_t: float,
+    discount: float,
+    black76: bool
+) -> Tuple[float, float, float, float]:
+    """Calculate option price, original vega, d1 and d2"""
+    if black76:
+        d1 = (log(s / k) + 0.5 * v * v * t) / (v * sqrt_t)
+        d2 = d1 - v * sqrt_t
+        price = cp * (s * norm_cdf(cp * d1) - k * norm_cdf(cp * d2)) * discount
+        vega = s * discount * norm_pdf(d1) * sqrt_t
+    else:
+        d1 = (log(s / k) + (r + 0.5 * v * v) * t) / (v * sqrt_t)
+        d2 = d1 - v * sqrt_t
+        price = cp * (s * norm_cdf(cp * d1) - k * norm_cdf(cp * d2) * discount)
+        vega = s * norm_pdf(d1) * sqrt_t
+
+    return price, vega, d1, d2
+
+
+@njit(cache=True, fastmath=True)
+def calculate_impv_seed(
+    price: float,
+    s: float,
+    k: float,
+    cp: float,
+    sqrt_t: float,
+    discount: float,
+    black76: bool
+) -> float:
+    """Estimate implied volatility with Corrado-Miller approximation"""
+    # Normalize into undiscounted call price of forward
+    if black76:
+        f = s
+    else:
+        f = s / discount
+
+    c = price / discount
+    if cp == -1:
+        c += f - k
+
+    a = c - (f - k) / 2
+    b = max(a * a - (f - k) * (f - k) / pi, 0.0)
+    v = sqrt(2 * pi) / (f + k) * (a + sqrt(b)) / sqrt_t
+
+    # Use default guess if approximation failed
+    if not v > 0:
+        v = 0.3
+
+    return v
+
+
+@njit(cache=True, fastmath=True)
+def calculate_impv(
+    price: float,
+    s: float,
+    k: float,
+    r: float,
+    t: float,
+    cp: float,
+    min_time_value: float,
+    sqrt_t: float,
+    discount: float,
+    black76: bool
+) -> float:
+    """Calculate option implied volatility with Halley's method"""
+    # Check option price must be positive
+    if price <= 0:
+        return 0.0
+
+    # Check if option price meets minimum value (exercise value)
+    if cp == 1 and price <= (s - k) * discount + min_time_value:
+        return 0.0
+    elif cp == -1 and price <= k * discount - s + min_time_value:
+        return 0.0
+
+    v = calculate_impv_seed(price, s, k, cp, sqrt_t, discount, black76)
+
+    for i in range(50):
+        p, vega, d1, d2 = calculate_price_vega(
+            s, k, r, t, v, cp, sqrt_t, discount, black76
+        )
+
+        # Break loop if vega too close to 0
+        if vega < 1e-10:
+            break
+
+        # Use vomma correction, fall back to Newton's method if not stable
+        diff = price - p
+        denominator = vega + 0.5 * diff * d1 * d2 / v
+
+        if denominator > 0:
+            dx = diff / denominator
+        else:
+            dx = diff / vega
+
+        # Break loop if error value meets requirement
+        if abs(dx) < 0.00001:
+            break
+
+        # Halve volatility instead of going non-positive
+        if v + dx > 0:
+            v += dx
+        else:
+            v /= 2
+
+    # Check end result to be non-negative
+    if v <= 0:
+        return 0.0
+
+    # Round to 4 decimal places
+    return np.round(v, 4)
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def batch_impv(
+    price: ndarray,
+    s: ndarray,
+    k: ndarray,
+    r: ndarray,
+    t: ndarray,
+    cp: ndarray,
+    min_time_value: ndarray,
+    sqrt_t: ndarray,
+    discount: ndarray,
+    black76: bool,
+    out: ndarray
+) -> None:
+    """Calculate implied volatility of option arrays into out array"""
+    for i in range(price.shape[0]):
+        out[i] = calculate_impv(
+            price[i], s[i], k[i], r[i], t[i], cp[i], min_time_value[i],
+            sqrt_t[i], discount[i], black76
+        )
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def batch_greeks(
+    s: ndarray,
+    k: ndarray,
+    r: ndarray,
+    t: ndarray,
+    v: ndarray,
+    cp: ndarray,
+    sqrt_t: ndarray,
+    discount: ndarray,
+    black76: bool,
+    annual_days: int,
+    out_price: ndarray,
+    out_delta: ndarray,
+    out_gamma: ndarray,
+    out_theta: ndarray,
+    out_vega: ndarray
+) -> None:
+    """Calculate price and greeks of option arrays into out arrays"""
+    for i in range(s.shape[0]):
+        s_i = s[i]
+        k_i = k[i]
+        r_i = r[i]
+        t_i = t[i]
+        v_i = v[i]
+        cp_i = cp[i]
+        sqrt_t_i = sqrt_t[i]
+        discount_i = discount[i]
+
+        # Return option space value and zero greeks if volatility not positive
+        if v_i <= 0:
+            out_price[i] = max(0.0, cp_i * (s_i - k_i))
+            out_delta[i] = 0.0
+            out_gamma[i] = 0.0
+            out_theta[i] = 0.0
+            out_vega[i] = 0.0
+            continue
+
+        # Shared by price and all greeks
+        if black76:
+            d1 = (log(s_i / k_i) + 0.5 * v_i * v_i * t_i) / (v_i * sqrt_t_i)
+        else:
+            d1 = (log(s_i / k_i) + (r_i + 0.5 * v_i * v_i) * t_i) / (v_i * sqrt_t_i)
+        d2 = d1 - v_i * sqrt_t_i
+
+        cdf_d1 = norm_cdf(cp_i * d1)
+        cdf_d2 = norm_cdf(cp_i * d2)
+        pdf_d1 = norm_pdf(d1)
+
+        if black76:
+            out_price[i] = cp_i * (s_i * cdf_d1 - k_i * cdf_d2) * discount_i
+            out_delta[i] = cp_i * discount_i * cdf_d1 * s_i * 0.01
+            out_gamma[i] = discount_i * pdf_d1 / (v_i * sqrt_t_i) * s_i * 0.0001
+            out_theta[i] = (
+                -s_i * discount_i * pdf_d1 * v_i / (2 * sqrt_t_i)
+                + cp_i * r_i * s_i * discount_i * cdf_d1
+                - cp_i * r_i * k_i * discount_i * cdf_d2
+            ) / annual_days
+            out_vega[i] = s_i * discount_i * pdf_d1 * sqrt_t_i / 100
+        else:
+            out_price[i] = cp_i * (s_i * cdf_d1 - k_i * cdf_d2 * discount_i)
+            out_delta[i] = cp_i * cdf_d1 * s_i * 0.01
+            out_gamma[i] = pdf_d1 / (v_i * sqrt_t_i) * s_i * 0.0001
+            out_theta[i] = (
+                -s_i * pdf_d1 * v_i / (2 * sqrt_t_i)
+                - cp_i * r_i * k_i * discount_i * cdf_d2
+            ) / annual_days
+            out_vega[i] = s_i * pdf_d1 * sqrt_t_i / 100
+
+
+def prepare_arrays(*arrays) -> Tuple[ndarray, ...]:
+    """Broadcast inputs into C-contiguous float64 arrays of same length"""
+    arrays = np.broadcast_arrays(
+        *[np.asarray(a, dtype=np.float64) for a in arrays]
+    )
+    return tuple(np.ascontiguousarray(a).ravel() for a in arrays)
+
+
+def prepare_time_values(
+    r: ndarray,
+    t: ndarray,
+    sqrt_t: ndarray = None,
+    discount: ndarray = None
+) -> Tuple[ndarray, ndarray]:
+    """Calculate square root of time and discount factor if not provided"""
+    if sqrt_t is None:
+        sqrt_t = np.sqrt(t)
+    if discount is None:
+        discount = np.exp(-np.asarray(r) * t)
+    return sqrt_t, discount
+
+
+def calculate_impv_array(
+    price: ndarray,
+    s: ndarray,
+    k: ndarray,
+    r: ndarray,
+    t: ndarray,
+    cp: ndarray,
+    min_time_value: ndarray,
+    black76: bool,
+    sqrt_t: ndarray = None,
+    discount: ndarray = None
+) -> ndarray:
+    """Calculate implied volatility of option arrays with kernel"""
+    sqrt_t, discount = prepare_time_values(r, t, sqrt_t, discount)
+    price, s, k, r, t, cp, min_time_value, sqrt_t, discount = prepare_arrays(
+        price, s, k, r, t, cp, min_time_value, sqrt_t, discount
+    )
+
+    impv = np.empty(price.shape[0])
+    batch_impv(
+        price, s, k, r, t, cp, min_time_value, sqrt_t, discount, black76, impv
+    )
+    return impv
+
+
+def calculate_greeks_array(
+    s: ndarray,
+    k: ndarray,
+    r: ndarray,
+    t: ndarray,
+    v: ndarray,
+    cp: ndarray,
+    black76: bool,
+    annual_days: int = 240,
+    sqrt_t: ndarray = None,
+    discount: ndarray = None
+) -> Tuple[ndarray, ndarray, ndarray, ndarray, ndarray]:
+    """Calculate price and greeks of option arrays with kernel"""
+    sqrt_t, discount = prepare_time_values(r, t, sqrt_t, discount)
+    s, k, r, t, v, cp, sqrt_t, discount = prepare_arrays(
+        s, k, r, t, v, cp, sqrt_t, discount
+    )
+
+    size = s.shape[0]
+    price = np.empty(size)
+    delta = np.empty(size)
+    gamma = np.empty(size)
+    theta = np.empty(size)
+    vega = np.empty(size)
+
+    batch_greeks(
+        s, k, r, t, v, cp, sqrt_t, discount, black76, annual_days,
+        price, delta, gamma, theta, vega
+    )
+    return price, delta, gamma, theta, vega
+
+
+array_cdf = special.ndtr
+
+
+def array_pdf(x: ndarray) -> ndarray:
+    """Standard normal probability density of array"""
+    if NUMEXPR_AVAILABLE:
+        return numexpr.evaluate(
+            "exp(-0.5 * x * x) / sqrt_2pi",
+            local_dict={"x": x, "sqrt_2pi": SQRT_2PI}
+        )
+
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def array_d1(
+    s: ndarray,
+    k: ndarray,
+    r: ndarray,
+    t: ndarray,
+    v: ndarray,
+    sqrt_t: ndarray,
+    black76: bool
+) -> ndarray:
+    """Calculate d1 of array"""
+    # Futures price has no drift, same as stock with zero interest rate
+    if black76:
+        r = 0.0
+
+    if NUMEXPR_AVAILABLE:
+        return numexpr.evaluate(
+            "(log(s / k) + (r + 0.5 * v * v) * t) / (v * sqrt_t)",
+            local_dict={"s": s, "k": k, "r": r, "t": t, "v": v, "sqrt_t": sqrt_t}
+        )
+
+    return (np.log(s / k) + (r + 0.5 * v * v) * t) / (v * sqrt_t)
+
+
+def calculate_impv_array_numpy(
+    price: ndarray,
+    s: ndarray,
+    k: ndarray,
+    r: ndarray,
+    t: ndarray,
+    cp: ndarray,
+    min_time_value: ndarray,
+    black76: bool,
+    sqrt_t: ndarray = None,
+    discount: ndarray = None
+) -> ndarray:
+    """Calculate implied volatility of option arrays with numpy"""
+    # Time related values stay the same during iteration, use them if
+    # already calculated
+    sqrt_t, discount = prepare_time_values(r, t, sqrt_t, discount)
+
+    price, s, k, r, t, cp, min_time_value, sqrt_t, discount = np.broadcast_arrays(
+        *[
+            np.asarray(a, dtype=np.float64)
+            for a in (price, s, k, r, t, cp, min_time_value, sqrt_t, discount)
+        ]
+    )
+    impv: ndarray = np.zeros(price.shape)
+
+    # Check option price must be positive and meets minimum value
+    meet: ndarray = (price > 0) & (
+        ((cp == 1) & (price > (s - k) * discount + min_time_value))
+        | ((cp == -1) & (price > k * discount - s + min_time_value))
+    )
+
+    # Estimate initial guess with Corrado-Miller approximation
+    if black76:
+        f: ndarray = s
+    else:
+        f: ndarray = s / discount
+
+    c: ndarray = price / discount + np.where(cp == -1, f - k, 0)
+    a: ndarray = c - (f - k) / 2
+    b: ndarray = np.maximum(a * a - (f - k) * (f - k) / pi, 0)
+    v: ndarray = SQRT_2PI / (f + k) * (a + np.sqrt(b)) / sqrt_t
+    v[~(v > 0)] = 0.3
+
+    # Calculate implied volatility with Halley's method
+    active: ndarray = meet.copy()
+
+    for i in range(50):
+        if not active.any():
+            break
+
+        index: ndarray = np.flatnonzero(active)
+        s_, k_, r_, t_, cp_ = s[index], k[index], r[index], t[index], cp[index]
+        sqrt_t_, discount_, v_ = sqrt_t[index], discount[index], v[index]
+
+        # Caculate option price and vega with current guess
+        d1: ndarray = array_d1(s_, k_, r_, t_, v_, sqrt_t_, black76)
+        d2: ndarray = d1 - v_ * sqrt_t_
+        cdf_d1: ndarray = array_cdf(cp_ * d1)
+        cdf_d2: ndarray = array_cdf(cp_ * d2)
+
+        if black76:
+            p: ndarray = cp_ * (s_ * cdf_d1 - k_ * cdf_d2) * discount_
+            vega: ndarray = s_ * discount_ * array_pdf(d1) * sqrt_t_
+        else:
+            p: ndarray = cp_ * (s_ * cdf_d1 - k_ * cdf_d2 * discount_)
+            vega: ndarray = s_ * array_pdf(d1) * sqrt_t_
+
+        # Calculate error value with vomma correction, fall back to
+        # Newton's method if not stable, and stop if vega too close to 0
+        diff: ndarray = price[index] - p
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            denominator: ndarray = vega + 0.5 * diff * d1 * d2 / v_
+            dx: ndarray = np.where(denominator > 0, diff / denominator, diff / vega)
+        dx[vega < 1e-10] = 0
+
+        # Stop options whose error value meets requirement
+        moving: ndarray = np.abs(dx) >= 0.00001
+
+        # Calculate guessed implied volatility of next round,
+        # halve it instead if going non-positive
+        step: ndarray = index[moving]
+        new_v: ndarray = v[step] + dx[moving]
+        v[step] = np.where(new_v > 0, new_v, v[step] / 2)
+
+        active[index[~moving]] = False
+
+    # Check end result to be non-negative, and round to 4 decimal places
+    valid: ndarray = meet & (v > 0)
+    impv[valid] = np.round(v[valid], 4)
+
+    return impv
+
+
+def calculate_greeks_array_numpy(
+    s: ndarray,
+    k: ndarray,
+    r: ndarray,
+    t: ndarray,
+    v: ndarray,
+    cp: ndarray,
+    black76: bool,
+    annual_days: int = 240,
+    sqrt_t: ndarray = None,
+    discount: ndarray = None
+) -> Tuple[ndarray, ndarray, ndarray, ndarray, ndarray]:
+    """Calculate price and greeks of option arrays with numpy"""
+    # Use square root of time and discount factor if already calculated
+    sqrt_t, discount = prepare_time_values(r, t, sqrt_t, discount)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1: ndarray = array_d1(s, k, r, t, v, sqrt_t, black76)
+        d2: ndarray = d1 - v * sqrt_t
+
+        # Shared by price and all greeks
+        cdf_d1: ndarray = array_cdf(cp * d1)
+        cdf_d2: ndarray = array_cdf(cp * d2)
+        pdf_d1: ndarray = array_pdf(d1)
+
+        if black76:
+            price: ndarray = cp * (s * cdf_d1 - k * cdf_d2) * discount
+            delta: ndarray = cp * discount * cdf_d1 * s * 0.01
+            gamma: ndarray = discount * pdf_d1 / (v * sqrt_t) * s * 0.0001
+            theta: ndarray = (
+                -s * discount * pdf_d1 * v / (2 * sqrt_t)
+                + cp * r * s * discount * cdf_d1
+                - cp * r * k * discount * cdf_d2
+            ) / annual_days
+            vega: ndarray = s * discount * pdf_d1 * sqrt_t / 100
+        else:
+            price: ndarray = cp * (s * cdf_d1 - k * cdf_d2 * discount)
+            delta: ndarray = cp * cdf_d1 * s * 0.01
+            gamma: ndarray = pdf_d1 / (v * sqrt_t) * s * 0.0001
+            theta: ndarray = (
+                -s * pdf_d1 * v / (2 * sqrt_t)
+                - cp * r * k * discount * cdf_d2
+            ) / annual_days
+            vega: ndarray = s * pdf_d1 * sqrt_t / 100
+
+    # Return option space value and zero greeks if volatility not positive
+    positive: ndarray = v > 0
+    price = np.where(positive, price, np.maximum(0, cp * (s - k)))
+    delta = np.where(positive, delta, 0)
+    gamma = np.where(positive, gamma, 0)
+    theta = np.where(positive, theta, 0)
+    vega = np.where(positive, vega, 0)
+
+    return price, delta, gamma, theta, vega
@@ -1,3 +1,4 @@
+import numpy as np
 from numpy import zeros, ndarray
 from math import exp, sqrt
 from typing import Tuple
@@ -200,19 +201,25 @@ def calculate_impv(
     r: float,
     t: float,
     cp: int,
-    n: int = DEFAULT_STEP
+    n: int = DEFAULT_STEP,
+    min_time_value: float = 0,
+    sqrt_t: float = 0.0,
+    discount: float = 0.0
 ) -> float:
     """Calculate option implied volatility"""
+    # sqrt_t and discount are accepted for the same signature as other
+    # models, but not used since tree discounts step by step
     # Check option price must be position
     if price <= 0:
         return 0
 
-    # Check if option price meets minimum value (exercise value)
+    # Check if option price meets minimum value (exercise value), time value
+    # less than min_time_value is not enough to be solved stably
     meet = False
 
-    if cp == 1 and price > (f - k):
+    if cp == 1 and price > (f - k) + min_time_value:
         meet = True
-    elif cp == -1 and price > (k - f):
+    elif cp == -1 and price > (k - f) + min_time_value:
         meet = True
 
     # If minimum value not met, return 0
@@ -249,3 +256,61 @@ def calculate_impv(
     v = round(v, 4)
 
     return v
+
+
+def calculate_greeks_array(
+    f: ndarray,
+    k: ndarray,
+    r: ndarray,
+    t: ndarray,
+    v: ndarray,
+    cp: ndarray,
+    n: int = DEFAULT_STEP,
+    annual_days: int = 240,
+    sqrt_t: ndarray = None,
+    discount: ndarray = None
+) -> Tuple[ndarray, ndarray, ndarray, ndarray, ndarray]:
+    """Calculate option price and greeks of array"""
+    # sqrt_t and discount are accepted for the same signature as other
+    # models, but not used since tree discounts step by step
+    f, k, r, t, v, cp = np.broadcast_arrays(f, k, r, t, v, cp)
+
+    # Binomial tree can not be vectorized, so calculate one by one
+    result = np.zeros((5, f.size))
+    for i in range(f.size):
+        result[:, i] = calculate_greeks(
+            f.flat[i], k.flat[i], r.flat[i], t.flat[i], v.flat[i],
+            int(cp.flat[i]), n, annual_days
+        )
+
+    return tuple(result)
+
+
+def calculate_impv_array(
+    price: ndarray,
+    f: ndarray,
+    k: ndarray,
+    r: ndarray,
+    t: ndarray,
+    cp: ndarray,
+    n: int = DEFAULT_STEP,
+    min_time_value: ndarray = 0,
+    sqrt_t: ndarray = None,
+    discount: ndarray = None
+) -> ndarray:
+    """Calculate option implied volatility of array"""
+    # sqrt_t and discount are accepted for the same signature as other
+    # models, but not used since tree discounts step by step
+    price, f, k, r, t, cp, min_time_value = np.broadcast_arrays(
+        price, f, k, r, t, cp, min_time_value
+    )
+
+    # Binomial tree can not be vectorized, so calculate one by one
+    impv = np.zeros(price.size)
+    for i in range(price.size):
+        impv[i] = calculate_impv(
+            price.flat[i], f.flat[i], k.flat[i], r.flat[i], t.flat[i],
+            int(cp.flat[i]), n, min_time_value.flat[i]
+        )
+
+    return impv
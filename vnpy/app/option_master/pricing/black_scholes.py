@@ -1,11 +1,52 @@
 from scipy import stats
-from math import log, pow, sqrt, exp
-from typing import Tuple
+from math import log, pow, sqrt, exp, pi
+from typing import Tuple, NamedTuple
+
+from numpy import ndarray
+
+from . import _greeks_kernels as kernels
+from . import _cuda_kernels as cuda_kernels
 
 cdf = stats.norm.cdf
 pdf = stats.norm.pdf
 
 
+class CoreData(NamedTuple):
+    """Intermediate values shared by option price and greeks"""
+
+    d1: float
+    d2: float
+    cdf_d1: float       # cdf(cp * d1)
+    cdf_d2: float       # cdf(cp * d2)
+    pdf_d1: float
+    sqrt_t: float
+    discount: float     # exp(-r * t)
+
+
+def calculate_core(
+    s: float,
+    k: float,
+    r: float,
+    t: float,
+    v: float,
+    cp: int,
+    sqrt_t: float = 0.0,
+    discount: float = 0.0
+) -> CoreData:
+    """Calculate d1, d2 and their normal distribution values once"""
+    if not sqrt_t:
+        sqrt_t = sqrt(t)
+    if not discount:
+        discount = exp(-r * t)
+
+    d1: float = (log(s / k) + (r + 0.5 * v * v) * t) / (v * sqrt_t)
+    d2: float = d1 - v * sqrt_t
+
+    return CoreData(
+        d1, d2, cdf(cp * d1), cdf(cp * d2), pdf(d1), sqrt_t, discount
+    )
+
+
 def calculate_d1(
     s: float,
     k: float,
@@ -33,7 +74,7 @@ def calculate_price(
         return max(0, cp * (s - k))
 
     if not d1:
-        d1: float = calculate_d1(s, k, r, r, v)
+        d1: float = calculate_d1(s, k, r, t, v)
     d2: float = d1 - v * sqrt(t)
 
     price: float = cp * (s * cdf(cp * d1) - k * cdf(cp * d2) * exp(-r * t))
@@ -150,61 +191,120 @@ def calculate_greeks(
     annual_days: int = 240
 ) -> Tuple[float, float, float, float, float]:
     """Calculate option price and greeks"""
-    d1: float = calculate_d1(s, k, r, t, v)
-    price: float = calculate_price(s, k, r, t, v, cp, d1)
-    delta: float = calculate_delta(s, k, r, t, v, cp, d1)
-    gamma: float = calculate_gamma(s, k, r, t, v, d1)
-    theta: float = calculate_theta(s, k, r, t, v, cp, d1, annual_days)
-    vega: float = calculate_vega(s, k, r, t, v, d1)
+    # Return option space value and zero greeks if volatility not positive
+    if v <= 0:
+        return max(0, cp * (s - k)), 0, 0, 0, 0
+
+    # Calculate d1, d2 and cdf/pdf only once for price and all greeks
+    core: CoreData = calculate_core(s, k, r, t, v, cp)
+
+    price: float = cp * (s * core.cdf_d1 - k * core.cdf_d2 * core.discount)
+    delta: float = cp * core.cdf_d1 * s * 0.01
+    gamma: float = core.pdf_d1 / (v * core.sqrt_t) * s * 0.0001
+    theta: float = (
+        -s * core.pdf_d1 * v / (2 * core.sqrt_t)
+        - cp * r * k * core.discount * core.cdf_d2
+    ) / annual_days
+    vega: float = s * core.pdf_d1 * core.sqrt_t / 100
     return price, delta, gamma, theta, vega
 
 
+def calculate_impv_seed(
+    price: float,
+    s: float,
+    k: float,
+    cp: int,
+    sqrt_t: float,
+    discount: float
+) -> float:
+    """Estimate implied volatility with Corrado-Miller approximation"""
+    # Normalize into undiscounted call price of forward
+    f: float = s / discount
+    c: float = price / discount
+    if cp == -1:
+        c += f - k
+
+    a: float = c - (f - k) / 2
+    b: float = max(a * a - (f - k) * (f - k) / pi, 0)
+    v: float = sqrt(2 * pi) / (f + k) * (a + sqrt(b)) / sqrt_t
+
+    # Use default guess if approximation failed
+    if v <= 0:
+        v = 0.3
+
+    return v
+
+
 def calculate_impv(
     price: float,
     s: float,
     k: float,
     r: float,
     t: float,
-    cp: int
+    cp: int,
+    min_time_value: float = 0,
+    sqrt_t: float = 0.0,
+    discount: float = 0.0
 ):
     """Calculate option implied volatility"""
     # Check option price must be positive
     if price <= 0:
         return 0
 
-    # Check if option price meets minimum value (exercise value)
+    # Time related values stay the same during iteration, use them if
+    # already calculated
+    if not sqrt_t:
+        sqrt_t = sqrt(t)
+    if not discount:
+        discount = exp(-r * t)
+
+    # Check if option price meets minimum value (exercise value), time value
+    # less than min_time_value is not enough to be solved stably
     meet: bool = False
 
-    if cp == 1 and (price > (s - k) * exp(-r * t)):
+    if cp == 1 and (price > (s - k) * discount + min_time_value):
         meet = True
-    elif cp == -1 and (price > k * exp(-r * t) - s):
+    elif cp == -1 and (price > k * discount - s + min_time_value):
         meet = True
 
     # If minimum value not met, return 0
     if not meet:
         return 0
 
-    # Calculate implied volatility with Newton's method
-    v: float = 0.3     # Initial guess of volatility
+    # Calculate implied volatility with Halley's method, starting from
+    # rational approximation to reduce the number of iterations
+    v: float = calculate_impv_seed(price, s, k, cp, sqrt_t, discount)
 
     for i in range(50):
         # Caculate option price and vega with current guess
-        p: float = calculate_price(s, k, r, t, v, cp)
-        vega: float = calculate_original_vega(s, k, r, t, v, cp)
+        core: CoreData = calculate_core(s, k, r, t, v, cp, sqrt_t, discount)
+        p: float = cp * (s * core.cdf_d1 - k * core.cdf_d2 * core.discount)
+        vega: float = s * core.pdf_d1 * core.sqrt_t
 
         # Break loop if vega too close to 0
-        if not vega:
+        if vega < 1e-10:
             break
 
-        # Calculate error value
-        dx: float = (price - p) / vega
+        # Calculate error value with vomma correction (vomma / vega = d1 * d2 / v),
+        # fall back to Newton's method if correction not stable
+        diff: float = price - p
+        denominator: float = vega + 0.5 * diff * core.d1 * core.d2 / v
+
+        if denominator > 0:
+            dx: float = diff / denominator
+        else:
+            dx: float = diff / vega
 
         # Check if error value meets requirement
         if abs(dx) < 0.00001:
             break
 
-        # Calculate guessed implied volatility of next round
-        v += dx
+        # Calculate guessed implied volatility of next round,
+        # halve it instead if going non-positive
+        if v + dx > 0:
+            v += dx
+        else:
+            v /= 2
 
     # Check end result to be non-negative
     if v <= 0:
@@ -214,3 +314,65 @@ def calculate_impv(
     v = round(v, 4)
 
     return v
+
+
+def calculate_greeks_array(
+    s: ndarray,
+    k: ndarray,
+    r: ndarray,
+    t: ndarray,
+    v: ndarray,
+    cp: ndarray,
+    annual_days: int = 240,
+    sqrt_t: ndarray = None,
+    discount: ndarray = None
+) -> Tuple[ndarray, ndarray, ndarray, ndarray, ndarray]:
+    """Calculate option price and greeks of array in one batch"""
+    if kernels.NUMBA_AVAILABLE:
+        return kernels.calculate_greeks_array(
+            s, k, r, t, v, cp, False, annual_days, sqrt_t, discount
+        )
+
+    return kernels.calculate_greeks_array_numpy(
+        s, k, r, t, v, cp, False, annual_days, sqrt_t, discount
+    )
+
+
+def calculate_impv_array(
+    price: ndarray,
+    s: ndarray,
+    k: ndarray,
+    r: ndarray,
+    t: ndarray,
+    cp: ndarray,
+    min_time_value: ndarray = 0,
+    sqrt_t: ndarray = None,
+    discount: ndarray = None
+) -> ndarray:
+    """Calculate option implied volatility of array in one batch"""
+    if kernels.NUMBA_AVAILABLE:
+        return kernels.calculate_impv_array(
+            price, s, k, r, t, cp, min_time_value, False, sqrt_t, discount
+        )
+
+    return kernels.calculate_impv_array_numpy(
+        price, s, k, r, t, cp, min_time_value, False, sqrt_t, discount
+    )
+
+
+def calculate_chain_gpu(
+    device_arrays: dict,
+    bid_price: ndarray,
+    ask_price: ndarray,
+    s: float,
+    r: float,
+    t: float,
+    sqrt_t: float,
+    discount: float,
+    annual_days: int = 240
+) -> Tuple[ndarray, ...]:
+    """Calculate implied volatility and greeks of option chain on GPU"""
+    return cuda_kernels.calculate_chain(
+        device_arrays, bid_price, ask_price, s, r, t, sqrt_t, discount,
+        False, annual_days
+    )
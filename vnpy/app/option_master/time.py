@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 
 
 ANNUAL_DAYS = 240
@@ -43,6 +44,12 @@ PUBLIC_HOLIDAYS = set([
 def calculate_days_to_expiry(option_expiry: datetime) -> int:
     """"""
     current_dt = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return calculate_trading_days(current_dt, option_expiry)
+
+
+@lru_cache(maxsize=4096)
+def calculate_trading_days(current_dt: datetime, option_expiry: datetime) -> int:
+    """Count trading days, cached since options share few expiry dates"""
     days = 1
 
     while current_dt <= option_expiry:
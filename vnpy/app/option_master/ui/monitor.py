@@ -482,7 +482,7 @@ class OptionGreeksMonitor(MonitorTable):
         underlying = self.option_engine.get_instrument(vt_symbol)
         self.update_row(vt_symbol, underlying)
 
-        for chain in underlying.chains.values():
+        for chain in underlying.chains:
             self.update_row(chain.chain_symbol, chain)
 
             for option in chain.options.values():